@@ -1,88 +1,98 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import plotly.express as px
+from datetime import timedelta
+
+# Pooled HTTP session with a 1-hour SQLite response cache, kept across reruns
+@st.cache_resource
+def get_session():
+    import requests_cache
+    from requests.adapters import HTTPAdapter
+    session = requests_cache.CachedSession('yf.cache', backend='sqlite', expire_after=timedelta(hours=1))
+    session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    return session
+
+# Investment decisions from strongest to weakest
+DECISIONS = ['Strong Buy', 'Buy', 'Hold', 'Sell']
+
+# Columns of the performance table, in the order summarize_performance returns them
+PERFORMANCE_COLUMNS = ['Total Return', 'Volatility', 'Last Performance', 'Today Open Price']
+
+# Cached batched download so reruns for the same tickers skip the network
+@st.cache_data(ttl=3600, show_spinner=False)
+def _download_history(tickers, period):
+    import yfinance as yf  # Deferred until the first download
+    return yf.download(list(tickers), period=period, group_by="ticker", threads=True, auto_adjust=False, session=get_session())
+
+# Performance summary for one ticker's price history
+def summarize_performance(df):
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    # Calculate daily returns directly on the ndarray
+    daily_returns = np.diff(closes) / closes[:-1]
+    # Calculate total return
+    total_return = closes[-1] / closes[0] - 1
+    if daily_returns.size > 1:
+        # Calculate volatility (standard deviation of daily returns)
+        volatility = float(np.std(daily_returns, ddof=1)) * np.sqrt(252.0)  # Annualized volatility
+    else:
+        volatility = np.nan
+    last_performance = float(daily_returns[-1]) if daily_returns.size else np.nan
+
+    return total_return, volatility, last_performance, df['Open'].iloc[-1]
 
 # Function to fetch stock data
 def fetch_stock_data(tickers):
-    data = {}
-    
-    for ticker in tickers:
-        if not ticker:  # Skip empty tickers
-            continue
-
-        try:
-            # Fetch historical data for the last year
-            df = yf.download(ticker, period="1y")
-            if df.empty:
-                st.warning(f"No data returned for {ticker}. Please check the ticker symbol.")
-                continue
-
-            # Calculate daily returns
-            df['Daily Return'] = df['Close'].pct_change()
-            # Calculate total return
-            total_return = (df['Close'].iloc[-1] - df['Close'].iloc[0]) / df['Close'].iloc[0]
-            # Calculate volatility (standard deviation of daily returns)
-            volatility = df['Daily Return'].std() * np.sqrt(252)  # Annualized volatility
-
-            data[ticker] = {
-                'Total Return': total_return,
-                'Volatility': volatility,
-                'Last Performance': df['Daily Return'].iloc[-1],
-                'Today Open Price': df['Open'].iloc[-1] if not df.empty else None
-            }
-        except Exception as e:
-            st.error(f"Error fetching data for {ticker}: {e}")
-    
-    return data
-
-# Investment evaluation logic
-def evaluate_investment(performance):
-    total_return = performance['Total Return']
-    volatility = performance['Volatility']
-
-    # Check if values are NaN
-    if pd.isna(total_return) or pd.isna(volatility):
-        return "N/A", np.nan  # Return default values
-
-    sharpe_ratio = total_return / volatility if volatility != 0 else np.nan
+    if not tickers:
+        return pd.DataFrame(columns=PERFORMANCE_COLUMNS, dtype=np.float64)
+
+    # Fetch historical data for the last year for all tickers in one batched request
+    try:
+        raw = _download_history(tuple(tickers), "1y")
+    except Exception as e:
+        st.error(f"Error fetching data for {', '.join(tickers)}: {e}")
+        return pd.DataFrame(columns=PERFORMANCE_COLUMNS, dtype=np.float64)
+    if not isinstance(raw.columns, pd.MultiIndex):
+        # A single ticker comes back with flat columns; nest it so slicing below is uniform
+        raw = pd.concat({tickers[0]: raw}, axis=1)
+
+    fetched = set(raw.columns.get_level_values(0))
+    frames = {ticker: raw[ticker].dropna(subset=['Close']) for ticker in tickers if ticker in fetched}
+    valid = {ticker: df for ticker, df in frames.items() if not df.empty}
 
-    if total_return > 0.2:
-        decision = "Strong Buy"
-    elif total_return > 0.1:
-        decision = "Buy"
-    elif total_return > 0:
-        decision = "Hold"
-    else:
-        decision = "Sell"
+    for ticker in tickers:
+        if ticker not in valid:
+            st.warning(f"No data returned for {ticker}. Please check the ticker symbol.")
 
-    return decision, sharpe_ratio
+    # Build the performance table column by column from a typed float array
+    stats = np.array([summarize_performance(df) for df in valid.values()], dtype=np.float64)
+    stats = stats.reshape(-1, len(PERFORMANCE_COLUMNS))
+    return pd.DataFrame({col: stats[:, i] for i, col in enumerate(PERFORMANCE_COLUMNS)}, index=list(valid))
 
 # Streamlit UI
 st.title("Stock Performance Evaluation")
 
 tickers_input = st.text_input("Enter stock tickers (comma-separated)", "AAPL, MSFT, GOOGL, NVDA, MU, TSLA")
-tickers = [ticker.strip() for ticker in tickers_input.split(',')]
+# Drop empty and repeated entries and upper-case once, matching yfinance's column keys and the download cache key
+tickers = list(dict.fromkeys(ticker.upper() for ticker in map(str.strip, tickers_input.split(',')) if ticker))
 
 if st.button("Analyze"):
-    performance_data = fetch_stock_data(tickers)
+    performance_df = fetch_stock_data(tickers)
     
-    if performance_data:
-        performance_df = pd.DataFrame.from_dict(performance_data, orient='index')
-
-        # Ensure numeric types
-        performance_df['Total Return'] = pd.to_numeric(performance_df['Total Return'], errors='coerce')
-        performance_df['Volatility'] = pd.to_numeric(performance_df['Volatility'], errors='coerce')
-
+    if not performance_df.empty:
         # Drop rows with NaN values
         performance_df.dropna(subset=['Total Return', 'Volatility'], inplace=True)
 
-        # Apply the evaluation function
-        try:
-            performance_df['Investment Decision'], performance_df['Sharpe Ratio'] = zip(*performance_df.apply(evaluate_investment, axis=1))
-        except Exception as e:
-            st.error(f"Error during evaluation: {e}")
+        # Investment evaluation logic, vectorized over all tickers
+        tr = performance_df['Total Return'].to_numpy()
+        vol = performance_df['Volatility'].to_numpy()
+        performance_df['Investment Decision'] = pd.Categorical(
+            np.select(
+                [tr > 0.2, tr > 0.1, tr > 0],
+                ['Strong Buy', 'Buy', 'Hold'],
+                default='Sell'),
+            categories=DECISIONS, ordered=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            performance_df['Sharpe Ratio'] = np.where(vol != 0, tr / vol, np.nan)
         
         # Display performance data
         with st.expander("View Performance Data", expanded=True):
@@ -90,14 +100,16 @@ if st.button("Analyze"):
 
         # Create visualizations
         if not performance_df.empty:
+            import plotly.express as px  # Deferred until there is something to plot
+
             bar_fig = px.bar(
                 performance_df,
                 x=performance_df.index,
                 y='Total Return',
                 title="Stock Total Return (Last 1 Year)",
                 labels={"Total Return": "Total Return"},
-                color='Total Return',
-                color_continuous_scale=px.colors.sequential.Viridis
+                color='Investment Decision',
+                category_orders={'Investment Decision': DECISIONS}
             )
             st.plotly_chart(bar_fig)
 
@@ -5,148 +5,270 @@ color-coded formatting. It also provides interactive candlestick charts using Pl
 to help users analyze stock price movements over specified time periods.
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
-import yfinance as yf
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared HTTP session for all yfinance calls, held by st.cache_resource so reruns reuse it
+@st.cache_resource
+def get_session():
+    import requests_cache
+    from requests.adapters import HTTPAdapter
+    session = requests_cache.CachedSession('yf.cache', backend='sqlite', expire_after=timedelta(hours=1))
+    session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    return session
 
 # Helper function to color the profit/loss and end_result columns
-def color_profit_loss(val):
-    color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-    return f'color: {color}'
-
-def get_historical_data(symbol):
-    ticker = yf.Ticker(symbol)
-    history = ticker.history(period="max")
-    
-    st.write(f"**Ticker symbol**: {ticker.info['symbol']}")
-    st.write(f"**History Data available from**: {history.index[0].strftime('%Y-%m-%d')} to {history.index[-1].strftime('%Y-%m-%d')}")
-    
-    return history
+def color_profit_loss(sub):
+    # Build the CSS for the whole subset in one vectorized pass instead of one call per cell
+    a = sub.to_numpy()
+    out = np.where(a > 0, 'color: green', np.where(a < 0, 'color: red', 'color: black'))
+    return pd.DataFrame(out, index=sub.index, columns=sub.columns)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_history_range(symbol):
+    # First trade date from Ticker.info; errors propagate so they are never cached
+    import yfinance as yf
+    info = yf.Ticker(symbol, session=get_session()).info
+    first_trade = info.get('firstTradeDateEpochUtc')
+    first_date = datetime.fromtimestamp(first_trade, tz=timezone.utc).date() if first_trade is not None else None
+    return info.get('symbol', symbol), first_date
 
 def color_growth(val, is_percentage=False):
     if is_percentage:
         return 'color: green' if val > 0 else 'color: red' if val < 0 else 'color: black'
     return 'color: green' if val > 0 else 'color: red' if val < 0 else 'color: black'
 
-def calculate_growth(data):
+def calculate_growth(frames):
+    # Line up the open prices of every symbol by date so growth is computed for all of them at once
+    opens = pd.DataFrame({symbol: data.set_index('Date')['Open'] for symbol, data in frames.items()})
+    if opens.empty:
+        return pd.Series(dtype=float), pd.Series(dtype=float)
+
     # Get the open prices at the start and end of the selected period
-    start_open = data['Open'].iloc[0]  # Open price on the first date
-    end_open = data['Open'].iloc[-1]    # Open price on the last date
+    start_open = opens.bfill().iloc[0]  # Open price on each symbol's first date
+    end_open = opens.ffill().iloc[-1]   # Open price on each symbol's last date
 
     # Calculate growth value and percentage
     growth_value = end_open - start_open
-    growth_percentage = (growth_value / start_open) * 100 if start_open != 0 else 0
-    
-    return growth_value, growth_percentage
+    growth_percentage = (growth_value / start_open * 100).where(start_open != 0, 0)
 
+    return growth_value, growth_percentage
 
-def get_stock_data(symbol, start_date, end_date):
-    data = yf.download(symbol, start=start_date, end=end_date)
-    data.reset_index(inplace=True)
-    return data
-
-def calculate_profit_loss(data):
-    data['Profit-Loss'] = data['Close'] - data['Open']
-    return data
 
-def calculate_adj_open(data):
-    # Ensure 'Adj Close' and 'Open' columns exist
-    if 'Adj Close' not in data.columns:
-        raise ValueError("'Adj Close' column is missing in the DataFrame")
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_stock_data(symbols, start_date, end_date):
+    if not symbols:
+        return {}
+    import yfinance as yf  # Loaded on first use
+
+    # Fetch every symbol in one batched request and split the result per symbol
+    raw = yf.download(list(symbols), start=start_date, end=end_date, group_by='ticker', threads=True,
+                      progress=False, session=get_session())
+    if not isinstance(raw.columns, pd.MultiIndex):
+        # A single symbol comes back with flat columns; nest it so slicing below is uniform
+        raw = pd.concat({symbols[0]: raw}, axis=1)
+    fetched = set(raw.columns.get_level_values(0))
+
+    frames = {}
+    for symbol in symbols:
+        if symbol not in fetched:
+            frames[symbol] = pd.DataFrame()
+            continue
+        frames[symbol] = raw[symbol].dropna(how='all').reset_index()
+    return frames
+
+def compute_derived(data):
+    # Ensure 'Open' and 'Close' columns exist
     if 'Open' not in data.columns:
         raise ValueError("'Open' column is missing in the DataFrame")
-
-    # Calculate Adj/Open as the difference between the previous day's Adj Close and the current day's Open
-    data['Adj/Open'] = data['Open'] - data['Adj Close'].shift(1)
-    
+    if 'Close' not in data.columns:
+        raise ValueError("'Close' column is missing in the DataFrame")
+
+    # Compute Profit-Loss, Adj/Open and End_Result in one pass over the underlying arrays
+    open_ = data['Open'].to_numpy()
+    close = data['Close'].to_numpy()
+    adj_close = data['Adj Close'].to_numpy() if 'Adj Close' in data.columns else close
+
+    profit_loss = close - open_
+    # Adj/Open is the difference between the previous day's Adj Close and the current day's Open
+    adj_open = np.empty_like(open_)
+    adj_open[:1] = np.nan
+    adj_open[1:] = open_[1:] - adj_close[:-1]
+
+    data['Profit-Loss'] = profit_loss
+    data['Adj/Open'] = adj_open
+    data['End_Result'] = adj_open + profit_loss
     return data
 
+# Columns shown with 3 decimal places in the data table
+FLOAT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Profit-Loss', 'Adj/Open', 'End_Result']
 
-def add_end_result(data):
-    data['End_Result'] = data['Adj/Open'] + data['Profit-Loss']
-    return data
+# Longer tables skip the per-cell Styler and are formatted by Streamlit's column_config instead
+STYLER_MAX_ROWS = 500
 
 def format_data(data):
     # Ensure 'Date' is in date format (remove time part if present)
     data['Date'] = pd.to_datetime(data['Date']).dt.date
     
-    # Define columns to be rounded
-    float_columns = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Profit-Loss', 'Adj/Open', 'End_Result']
-    
-    # Convert columns to numeric types if they aren't already
-    for col in float_columns:
-        if col in data.columns:
-            data[col] = pd.to_numeric(data[col], errors='coerce')  # Ensure the column is numeric
-    
+    # Define columns to be rounded; get_stock_data and compute_derived already leave them numeric
+    float_columns = FLOAT_COLUMNS
+
     # Round numerical columns to 3 decimal places
-    data[float_columns] = data[float_columns].applymap(lambda x: round(x, 3) if pd.notnull(x) else x)
+    data[float_columns] = data[float_columns].round(3)
+
+    # For long date ranges return the plain frame; colors are not worth O(rows x cols) styling work
+    if len(data) > STYLER_MAX_ROWS:
+        return data
 
      # Apply color formatting to the 'Profit-Loss' 'Adj/Open' and 'End_Result' columns
-    styled_data = data.style.applymap(color_profit_loss, subset=['Profit-Loss', 'Adj/Open','End_Result'])
+    styled_data = data.style.apply(color_profit_loss, subset=['Profit-Loss', 'Adj/Open','End_Result'], axis=None)
 
      # Ensure that the formatted table displays values with 3 decimal places
     styled_data = styled_data.format(subset=float_columns, formatter="{:.3f}")
     
     return styled_data
 
-def create_candlestick_chart(data, symbol):
-    # Calculate moving averages
-    data['SMA20'] = data['Close'].rolling(window=20).mean()
-    data['EMA20'] = data['Close'].ewm(span=20, adjust=False).mean()
-
-    # Create the candlestick chart
-    fig = go.Figure()
-
-    # Add candlestick trace
-    fig.add_trace(go.Candlestick(
-        x=data['Date'],
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
-        name='Candlestick'
-    ))
-
-    # Add SMA trace
-    fig.add_trace(go.Scatter(
-        x=data['Date'],
-        y=data['SMA20'],
-        mode='lines',
-        name='SMA 20',
-        line=dict(color='blue')
-    ))
-
-    # Add EMA trace
-    fig.add_trace(go.Scatter(
-        x=data['Date'],
-        y=data['EMA20'],
-        mode='lines',
-        name='EMA 20',
-        line=dict(color='red')
-    ))
+def sma_ema(close, window, alpha):
+    # Same results as pandas rolling(window).mean() and ewm(alpha=alpha, adjust=False).mean()
+    n = close.size
+    sma = np.empty(n)
+    ema = np.empty(n)
+    total = 0.0
+    nan_count = 0
+    weighted = np.nan
+    old_wt = 1.0
+    for i in range(n):
+        value = close[i]
+        if np.isnan(value):
+            nan_count += 1
+        else:
+            total += value
+        if i >= window:
+            old = close[i - window]
+            if np.isnan(old):
+                nan_count -= 1
+            else:
+                total -= old
+        sma[i] = total / window if i >= window - 1 and nan_count == 0 else np.nan
+
+        if np.isnan(weighted):
+            weighted = value
+        else:
+            # Missing closes still decay the previous weight, as pandas does with ignore_na=False
+            old_wt *= 1.0 - alpha
+            if not np.isnan(value):
+                weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+                old_wt = 1.0
+        ema[i] = weighted
+    return sma, ema
+
+# Compile sma_ema on first use and keep the dispatcher across reruns; None without numba
+@st.cache_resource
+def get_sma_ema_kernel():
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(sma_ema)
+
+def moving_averages(close):
+    # Calculate SMA20 and EMA20 as arrays, leaving the caller's frame untouched
+    kernel = get_sma_ema_kernel()
+    if kernel is not None:
+        return kernel(close.to_numpy(), 20, 2 / 21)
+    return close.rolling(window=20).mean().to_numpy(), close.ewm(span=20, adjust=False).mean().to_numpy()
+
+# Values shown in the candlestick's hover label; the moving averages label themselves
+HOVER_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Profit-Loss', 'Adj/Open', 'End_Result']
+
+# Height of each symbol's row in the combined chart, in pixels
+CHART_ROW_HEIGHT = 450
+
+def create_candlestick_chart(frames):
+    # Plotly is only loaded once there is something to draw
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    symbols = list(frames)
+    n_rows = len(symbols)
+
+    # Keep a ~60px gap between rows, within plotly's 1 / (rows - 1) limit
+    vertical_spacing = min(0.06, 60 / (CHART_ROW_HEIGHT * n_rows))
+    if n_rows > 1:
+        vertical_spacing = min(vertical_spacing, 1 / (n_rows - 1))
+
+    # One figure with a row per symbol, sharing the date axis
+    fig = make_subplots(
+        rows=n_rows, cols=1, shared_xaxes=True, vertical_spacing=vertical_spacing,
+        subplot_titles=[f'{symbol} Stock Price with Moving Averages' for symbol in symbols]
+    )
 
-    fig.update_layout(
-        title=f'{symbol} Stock Price with Moving Averages',
-        xaxis_title='Date',
-        yaxis_title='Price',
-        xaxis_rangeslider_visible=False,
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1m", step="month", stepmode="backward"),
-                    dict(count=6, label="6m", step="month", stepmode="backward"),
-                    dict(count=1, label="YTD", step="year", stepmode="todate"),
-                    dict(count=1, label="1y", step="year", stepmode="backward"),
-                    dict(step="all")
-                ])
+    traces, rows = [], []
+    for row, (symbol, data) in enumerate(frames.items(), start=1):
+        sma20, ema20 = moving_averages(data['Close'])
+
+        # Candlestick traces do not support hovertemplate, so build their hover text column-wise
+        labels = [f"{col}: " + data[col].map('{:.3f}'.format) for col in HOVER_COLUMNS]
+        hover = labels[0].str.cat(labels[1:], sep="<br>").to_numpy()
+
+        # Candlestick with its SMA and EMA traces, passing plain ndarrays
+        x = data['Date'].to_numpy()
+        traces += [
+            go.Candlestick(
+                x=x,
+                open=data['Open'].to_numpy(),
+                high=data['High'].to_numpy(),
+                low=data['Low'].to_numpy(),
+                close=data['Close'].to_numpy(),
+                name=f'{symbol} Candlestick',
+                legendgroup=symbol,
+                hovertext=hover,
+                hoverinfo="text"
             ),
-            rangeslider=dict(visible=True),
-            type="date"
-        ),
-        yaxis=dict(
-            fixedrange=False
+            go.Scatter(
+                x=x,
+                y=sma20,
+                mode='lines',
+                name=f'{symbol} SMA 20',
+                legendgroup=symbol,
+                line=dict(color='blue'),
+                hovertemplate="SMA 20: %{y:.3f}<extra></extra>"
+            ),
+            go.Scatter(
+                x=x,
+                y=ema20,
+                mode='lines',
+                name=f'{symbol} EMA 20',
+                legendgroup=symbol,
+                line=dict(color='red'),
+                hovertemplate="EMA 20: %{y:.3f}<extra></extra>"
+            )
+        ]
+        rows += [row] * 3
+    fig.add_traces(traces, rows=rows, cols=[1] * len(rows))
+
+    # Candlestick traces turn a range slider on for every x axis; keep only the bottom one
+    fig.update_xaxes(type="date", rangeslider=dict(visible=False))
+    fig.update_xaxes(
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label="1m", step="month", stepmode="backward"),
+                dict(count=6, label="6m", step="month", stepmode="backward"),
+                dict(count=1, label="YTD", step="year", stepmode="todate"),
+                dict(count=1, label="1y", step="year", stepmode="backward"),
+                dict(step="all")
+            ])
         ),
+        row=1, col=1
+    )
+    fig.update_xaxes(title_text='Date', rangeslider=dict(visible=True), row=n_rows, col=1)
+    fig.update_yaxes(title_text='Price', fixedrange=False)
+    fig.update_layout(
+        height=CHART_ROW_HEIGHT * n_rows,
+        hovermode="x unified",
         legend=dict(
             orientation="h",
             yanchor="bottom",
@@ -156,26 +278,76 @@ def create_candlestick_chart(data, symbol):
         )
     )
 
-    # Add hover text to traces
-    fig.update_traces(
-        hovertext=data.apply(lambda row: f"Date: {row['Date']}<br>Open: {row['Open']:.3f}<br>High: {row['High']:.3f}<br>Low: {row['Low']:.3f}<br>Close: {row['Close']:.3f}<br>Profit-Loss: {row['Profit-Loss']:.3f}<br>Adj/Open: {row['Adj/Open']:.3f}<br>End_Result: {row['End_Result']:.3f}<br>SMA20: {row['SMA20']:.3f}<br>EMA20: {row['EMA20']:.3f}", axis=1),
-        hoverinfo="text"
-    )
-
     return fig
 
+# Reuse built figures across reruns; _frames is not hashed, shapes identifies the data instead
+@st.cache_resource(ttl=3600, max_entries=64)
+def cached_candlestick_chart(symbols, start_date, end_date, shapes, _frames):
+    return create_candlestick_chart(_frames)
+
+def analyze_symbol(stock_data):
+    # Per-symbol processing, without touching Streamlit so it can run in a worker thread
+    stock_data = compute_derived(stock_data)
+    formatted_data = format_data(stock_data)
+    return stock_data, formatted_data
+
+def run_analysis(symbols, start_date, end_date):
+    # Download and process every symbol in worker threads that share this run's ScriptRunContext
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(symbols))),
+                            initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx())) as executor:
+        range_futures = {symbol: executor.submit(get_history_range, symbol) for symbol in symbols}
+        stock_frames = get_stock_data(tuple(symbols), start_date, end_date)
+
+        growth_values, growth_percentages = calculate_growth(
+            {symbol: data for symbol, data in stock_frames.items() if not data.empty})
+
+        analysis_futures = {
+            symbol: executor.submit(analyze_symbol, data)
+            for symbol, data in stock_frames.items() if not data.empty
+        }
+
+    symbol_results = []
+    chart_frames = {}
+    for symbol in symbols:
+        try:
+            ticker_symbol, first_date = range_futures[symbol].result()
+        except Exception:
+            ticker_symbol, first_date = symbol, None  # Unknown symbol; the batched price download reports it separately
+        formatted_data, growth = None, None
+        if symbol in analysis_futures:
+            stock_data, formatted_data = analysis_futures[symbol].result()
+            chart_frames[symbol] = stock_data
+            growth = (growth_values.loc[symbol], growth_percentages.loc[symbol])
+        symbol_results.append((symbol, ticker_symbol, first_date, formatted_data, growth))
+
+    fig = None
+    if chart_frames:
+        # A single chart holding every symbol, one row each
+        shapes = tuple((len(data), data['Date'].iloc[-1]) for data in chart_frames.values())
+        fig = cached_candlestick_chart(tuple(chart_frames), start_date, end_date, shapes, chart_frames)
+
+    return symbol_results, fig
+
 
 def main():
     st.title('Stock Data Analysis')
 
     st.sidebar.header('User Input')
     symbols_input = st.sidebar.text_input('Enter stock symbols (comma-separated)', 'AAPL,GOOGL,MSFT')
-    symbols = [symbol.strip() for symbol in symbols_input.split(',')]
+    # Normalize case and drop empty or repeated symbols, keeping the input order
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in map(str.strip, symbols_input.split(',')) if symbol))
     start_date = st.sidebar.date_input('Start Date', value=pd.to_datetime('2024-01-01'))
     #end_date = st.sidebar.date_input('End Date', value=pd.to_datetime('2024-07-11'))
     #end_date = st.sidebar.date_input('End Date', value=datetime.now().date())
     end_date = st.sidebar.date_input('End Date', value=datetime.now().date() + timedelta(days=1))
     
+    if st.sidebar.button('Clear cache'):
+        # Drop cached downloads, HTTP responses, figures and session results so the next analysis refetches
+        get_session().cache.clear()
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        st.session_state.pop('results', None)
+
     # Initialize the variable
     show_results_clicked = False
 
@@ -183,28 +355,34 @@ def main():
         show_results_clicked = True
 
     if show_results_clicked:
-        for symbol in symbols:
-            history = get_historical_data(symbol)
-            stock_data = get_stock_data(symbol, start_date, end_date)
-
-            if not stock_data.empty:
-                stock_data = calculate_profit_loss(stock_data)
-                stock_data = calculate_adj_open(stock_data)
-                stock_data = add_end_result(stock_data)
-
-                formatted_data = format_data(stock_data)
-
+        # Reuse the results of the last inputs; only that one entry is kept
+        key = (tuple(symbols), start_date, end_date)
+        cached = st.session_state.get('results')
+        if cached is None or cached[0] != key:
+            cached = st.session_state.results = (key, run_analysis(symbols, start_date, end_date))
+        symbol_results, fig = cached[1]
+
+        for symbol, ticker_symbol, first_date, formatted_data, growth in symbol_results:
+            st.write(f"**Ticker symbol**: {ticker_symbol}")
+            if first_date is not None:
+                st.write(f"**History Data available from**: {first_date.strftime('%Y-%m-%d')} to today")
+
+            if formatted_data is not None:
                 st.subheader(f'{symbol} Stock Data')
                 #st.dataframe(formatted_data, width=1200, height=400)
-                st.dataframe(formatted_data, use_container_width=True)  # Ensure the table uses available width
-
-                 # Calculate growth and display it
-                growth_value, growth_percentage = calculate_growth(stock_data)
+                column_config = None
+                if isinstance(formatted_data, pd.DataFrame):
+                    # Unstyled large table: let Streamlit apply the 3-decimal format per column
+                    column_config = {col: st.column_config.NumberColumn(format="%.3f") for col in FLOAT_COLUMNS}
+                st.dataframe(formatted_data, use_container_width=True, column_config=column_config)  # Ensure the table uses available width
+
+                 # Display the growth computed for all symbols together
+                growth_value, growth_percentage = growth
                 st.write(f"**Growth Value**: {growth_value:.2f}")
                 st.write(f"**Growth Percentage**: {growth_percentage:.2f}%")
-                      
-                fig = create_candlestick_chart(stock_data, symbol)
-                st.plotly_chart(fig)
+
+        if fig is not None:
+            st.plotly_chart(fig)
 
                                   
     if st.sidebar.button('New Analysis'):